@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Runner compartilhado para os scripts de teste standalone
+
+test_integration.py, test_local.py e test_local_simple.py repetiam o mesmo
+esqueleto de banner + loop + resumo; centralizá-lo aqui deixa cada
+run_*_tests reduzido a montar sua lista de testes e delegar. Num processo
+pytest único os módulos pesados (pandas/pyarrow, boto3) já são
+compartilhados via sys.modules, então o runner em si não precisa
+importá-los.
+"""
+
+
+def print_banner(title: str):
+    """Imprime o banner de abertura de uma suíte"""
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def summarize(results, *, pass_threshold: float = 0.8,
+              summary_title: str = "📊 RESUMO DOS TESTES",
+              success_msg: str = "🎉 Todos os testes passaram!",
+              failure_msg: str = "⚠️  Alguns testes falharam.") -> bool:
+    """Imprime o resumo de uma suíte e aplica o limiar de aprovação
+
+    Args:
+        results: Lista de tuplas (nome, passou)
+        pass_threshold: Fração mínima de testes aprovados
+        summary_title: Título do bloco de resumo
+        success_msg: Mensagem final quando o limiar é atingido
+        failure_msg: Mensagem final caso contrário
+
+    Returns:
+        True se a fração de aprovados atingiu o limiar
+    """
+    print("\n" + "=" * 60)
+    print(summary_title)
+    print("=" * 60)
+
+    passed = 0
+    for test_name, result in results:
+        status = "✅ PASSOU" if result else "❌ FALHOU"
+        print(f"{test_name:<30} {status}")
+        if result:
+            passed += 1
+
+    print(f"\nResultado: {passed}/{len(results)} testes passaram")
+
+    if passed >= len(results) * pass_threshold:
+        print(success_msg)
+        return True
+    print(failure_msg)
+    return False
+
+
+def run(title: str, tests, *, pass_threshold: float = 0.8,
+        summary_title: str = "📊 RESUMO DOS TESTES",
+        success_msg: str = "🎉 Todos os testes passaram!",
+        failure_msg: str = "⚠️  Alguns testes falharam.") -> bool:
+    """Executa uma suíte sequencial de testes com banner e resumo
+
+    Args:
+        title: Título do banner de abertura
+        tests: Lista de tuplas (nome, função) a executar em ordem
+        pass_threshold: Fração mínima de testes aprovados
+        summary_title: Título do bloco de resumo
+        success_msg: Mensagem final quando o limiar é atingido
+        failure_msg: Mensagem final caso contrário
+
+    Returns:
+        True se a fração de aprovados atingiu o limiar
+    """
+    print_banner(title)
+
+    results = []
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        print("-" * 40)
+        try:
+            result = test_func()
+        except Exception as e:
+            print(f"❌ Erro durante teste: {e}")
+            result = False
+        results.append((test_name, result))
+
+    return summarize(
+        results,
+        pass_threshold=pass_threshold,
+        summary_title=summary_title,
+        success_msg=success_msg,
+        failure_msg=failure_msg,
+    )
@@ -13,8 +13,21 @@ import json
 import logging
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
+from functools import lru_cache
 from typing import Dict, Optional, Any
 
+@lru_cache(maxsize=1)
+def _get_caller_identity(region: str) -> Dict[str, Any]:
+    """Retorna a identidade STS do processo, memoizada
+
+    A identidade é imutável durante a vida do processo; chamadas repetidas
+    (ex.: validate_aws_credentials via get_configuration_summary e testes)
+    reutilizam a primeira resposta em vez de pagar um novo round-trip.
+    Exceções não são cacheadas, então falhas transitórias são re-tentadas.
+    """
+    sts_client = boto3.client('sts', region_name=region)
+    return sts_client.get_caller_identity()
+
 class AWSConfigManager:
     """Gerenciador de configuração AWS"""
     
@@ -166,10 +179,9 @@ class AWSConfigManager:
             True se as credenciais são válidas, False caso contrário
         """
         try:
-            # Tentar fazer uma chamada simples para verificar credenciais
-            sts_client = boto3.client('sts', region_name=self.region)
-            response = sts_client.get_caller_identity()
-            
+            # Identidade memoizada: só a primeira validação paga o round-trip STS
+            response = _get_caller_identity(self.region)
+
             account = response.get('Account', 'N/A')
             arn = response.get('Arn', 'N/A')
             
@@ -10,6 +10,7 @@ import os
 import json
 import logging
 import requests
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
@@ -23,6 +24,84 @@ from filter_manager import FilterManager
 from storage_manager import StorageManager
 from aws_config import setup_aws_environment
 
+# Templates de schema dos campos nested, construídos uma única vez no import:
+# normalize_record_schema roda por registro no caminho quente e reconstruía
+# estes dicts a cada chamada
+_DEFAULT_UNIDADE_SCHEMA = {
+    'codigoIbge': None,
+    'codigoUnidade': None,
+    'municipioNome': None,
+    'nomeUnidade': None,
+    'ufNome': None,
+    'ufSigla': None
+}
+
+_DEFAULT_ORGAO_SCHEMA = {
+    'cnpj': None,
+    'esferaId': None,
+    'poderId': None,
+    'razaoSocial': None
+}
+
+_DEFAULT_AMPARO_SCHEMA = {
+    'codigo': None,
+    'descricao': None,
+    'nome': None
+}
+
+_DEFAULT_FONTE_SCHEMA = {
+    'codigo': None,
+    'dataInclusao': None,
+    'descricao': None,
+    'nome': None
+}
+
+
+def _date_range_strings(start_date: datetime, end_date: datetime,
+                        date_format: str) -> List[str]:
+    """Enumera os dias [start_date, end_date] como strings formatadas
+
+    Para o formato ISO padrão, um único np.arange de datetime64[D] gera o
+    intervalo inteiro numa alocação vetorizada — em backfills de meses isso
+    substitui um round-trip timedelta+strftime por dia. Formatos customizados
+    caem no loop com strftime.
+    """
+    if date_format == '%Y-%m-%d':
+        start = np.datetime64(start_date.date())
+        end = np.datetime64(end_date.date()) + np.timedelta64(1, 'D')
+        return np.arange(start, end, dtype='datetime64[D]').astype(str).tolist()
+
+    dates = []
+    current_date = start_date
+    while current_date.date() <= end_date.date():
+        dates.append(current_date.strftime(date_format))
+        current_date += timedelta(days=1)
+    return dates
+
+
+def _parse_date(date_str: str, date_format: str) -> datetime:
+    """Converte uma data string no formato configurado para datetime
+
+    Para o formato ISO padrão, fromisoformat usa um parser C dedicado em vez
+    do strptime, que reinterpreta o format string a cada chamada. Formatos
+    customizados caem no strptime.
+    """
+    if date_format == '%Y-%m-%d':
+        return datetime.fromisoformat(date_str)
+    return datetime.strptime(date_str, date_format)
+
+
+def _apply_nested_defaults(value: Optional[Dict[str, Any]],
+                           defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """Completa um campo nested com o template de defaults
+
+    Um único merge de dicts ({**defaults, **value}) substitui o loop
+    campo-a-campo: chaves presentes vencem, ausentes herdam o default.
+    """
+    if not value:
+        return dict(defaults)
+    return {**defaults, **value}
+
 
 @dataclass
 class ExtractorConfig:
@@ -141,7 +220,7 @@ class PNCPContractionsExtractor:
         
     def _get_partitioned_path(self, date_str: str) -> Path:
         """Retorna o caminho particionado para uma data específica"""
-        date_obj = datetime.strptime(date_str, self.config.date_format)
+        date_obj = _parse_date(date_str, self.config.date_format)
         base_dir = Path(self.config.output_dir)
         
         if self.config.partitioned_structure:
@@ -335,120 +414,52 @@ class PNCPContractionsExtractor:
         except Exception as e:
             self.logger.warning(f"Erro ao enriquecer registro: {e}")
         
-        # Aplicar normalização de schema antes de retornar
-        normalized_record = self.normalize_record_schema(enriched)
-        return normalized_record
-    
-    def normalize_record_schema(self, record: Dict[str, Any]) -> Dict[str, Any]:
-        """Normaliza o schema do registro para garantir consistência entre parquets"""
-        normalized = record.copy()
-        
-        # Definir esquema padrão para campos nested
-        default_unidade_schema = {
-            'codigoIbge': None,
-            'codigoUnidade': None,
-            'municipioNome': None,
-            'nomeUnidade': None,
-            'ufNome': None,
-            'ufSigla': None
-        }
-        
-        default_orgao_schema = {
-            'cnpj': None,
-            'esferaId': None,
-            'poderId': None,
-            'razaoSocial': None
-        }
-        
-        default_amparo_schema = {
-            'codigo': None,
-            'descricao': None,
-            'nome': None
-        }
-        
-        default_fonte_schema = {
-            'codigo': None,
-            'dataInclusao': None,
-            'descricao': None,
-            'nome': None
-        }
-        
-        # Normalizar unidadeOrgao (sempre presente)
-        if 'unidadeOrgao' in normalized:
-            if normalized['unidadeOrgao'] is None:
-                normalized['unidadeOrgao'] = default_unidade_schema.copy()
-            else:
-                # Garantir que todos os campos existem
-                for field, default_value in default_unidade_schema.items():
-                    if field not in normalized['unidadeOrgao']:
-                        normalized['unidadeOrgao'][field] = default_value
-        else:
-            normalized['unidadeOrgao'] = default_unidade_schema.copy()
-        
-        # Normalizar orgaoEntidade (sempre presente)
-        if 'orgaoEntidade' in normalized:
-            if normalized['orgaoEntidade'] is None:
-                normalized['orgaoEntidade'] = default_orgao_schema.copy()
-            else:
-                for field, default_value in default_orgao_schema.items():
-                    if field not in normalized['orgaoEntidade']:
-                        normalized['orgaoEntidade'][field] = default_value
-        else:
-            normalized['orgaoEntidade'] = default_orgao_schema.copy()
-        
-        # Normalizar amparoLegal (sempre presente)
-        if 'amparoLegal' in normalized:
-            if normalized['amparoLegal'] is None:
-                normalized['amparoLegal'] = default_amparo_schema.copy()
-            else:
-                for field, default_value in default_amparo_schema.items():
-                    if field not in normalized['amparoLegal']:
-                        normalized['amparoLegal'][field] = default_value
-        else:
-            normalized['amparoLegal'] = default_amparo_schema.copy()
-        
-        # Normalizar unidadeSubRogada (opcional)
-        if 'unidadeSubRogada' in normalized:
-            if normalized['unidadeSubRogada'] is None:
-                normalized['unidadeSubRogada'] = default_unidade_schema.copy()
-            else:
-                for field, default_value in default_unidade_schema.items():
-                    if field not in normalized['unidadeSubRogada']:
-                        normalized['unidadeSubRogada'][field] = default_value
-        else:
-            normalized['unidadeSubRogada'] = default_unidade_schema.copy()
-        
-        # Normalizar orgaoSubRogado (opcional)  
-        if 'orgaoSubRogado' in normalized:
-            if normalized['orgaoSubRogado'] is None:
-                normalized['orgaoSubRogado'] = default_orgao_schema.copy()
-            else:
-                for field, default_value in default_orgao_schema.items():
-                    if field not in normalized['orgaoSubRogado']:
-                        normalized['orgaoSubRogado'][field] = default_value
-        else:
-            normalized['orgaoSubRogado'] = default_orgao_schema.copy()
-        
-        # Normalizar fontesOrcamentarias (array)
-        if 'fontesOrcamentarias' in normalized:
-            if normalized['fontesOrcamentarias'] is None:
-                normalized['fontesOrcamentarias'] = []
+        # A normalização de schema roda em lote por página
+        # (normalize_records_schema), não por registro aqui
+        return enriched
+
+    def normalize_records_schema(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Normaliza o schema de um lote de registros in-place
+
+        Versão em lote de normalize_record_schema: um único frame Python por
+        página em vez de um dispatch de método por registro. Os templates de
+        defaults e o helper de merge viram locals do loop, e os registros
+        (já copiados no enriquecimento) são normalizados in-place, sem um
+        record.copy() adicional por linha.
+        """
+        apply_defaults = _apply_nested_defaults
+        fonte_schema = _DEFAULT_FONTE_SCHEMA
+
+        for record in records:
+            record['unidadeOrgao'] = apply_defaults(
+                record.get('unidadeOrgao'), _DEFAULT_UNIDADE_SCHEMA)
+            record['orgaoEntidade'] = apply_defaults(
+                record.get('orgaoEntidade'), _DEFAULT_ORGAO_SCHEMA)
+            record['amparoLegal'] = apply_defaults(
+                record.get('amparoLegal'), _DEFAULT_AMPARO_SCHEMA)
+            record['unidadeSubRogada'] = apply_defaults(
+                record.get('unidadeSubRogada'), _DEFAULT_UNIDADE_SCHEMA)
+            record['orgaoSubRogado'] = apply_defaults(
+                record.get('orgaoSubRogado'), _DEFAULT_ORGAO_SCHEMA)
+
+            # Normalizar fontesOrcamentarias (array)
+            fontes = record.get('fontesOrcamentarias')
+            if fontes:
+                record['fontesOrcamentarias'] = [
+                    apply_defaults(fonte, fonte_schema) for fonte in fontes
+                ]
             else:
-                # Normalizar cada elemento do array
-                normalized_fontes = []
-                for fonte in normalized['fontesOrcamentarias']:
-                    if fonte is None:
-                        fonte = default_fonte_schema.copy()
-                    else:
-                        for field, default_value in default_fonte_schema.items():
-                            if field not in fonte:
-                                fonte[field] = default_value
-                    normalized_fontes.append(fonte)
-                normalized['fontesOrcamentarias'] = normalized_fontes
-        else:
-            normalized['fontesOrcamentarias'] = []
-        
-        return normalized
+                record['fontesOrcamentarias'] = []
+
+        return records
+
+    def normalize_record_schema(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Normaliza o schema do registro para garantir consistência entre parquets
+
+        Conveniência para um registro avulso; o caminho quente usa
+        normalize_records_schema direto na lista da página.
+        """
+        return self.normalize_records_schema([record.copy()])[0]
     
     def extract_modalidade_parallel(self, start_date: str, end_date: str, modalidade: str) -> List[Dict[str, Any]]:
         """Extrai todos os dados de uma modalidade usando paginação paralela"""
@@ -480,7 +491,10 @@ class PNCPContractionsExtractor:
                         enriched_record = self.enrich_record_with_domain_data(record)
                         if enriched_record is not None:  # Só adiciona se passou no filtro
                             enriched_data.append(enriched_record)
-                    
+
+                    # Normalizar schema da página inteira de uma vez
+                    self.normalize_records_schema(enriched_data)
+
                     all_data.extend(enriched_data)
                     if count > 0:
                         filtered_count = len(enriched_data)
@@ -526,7 +540,7 @@ class PNCPContractionsExtractor:
             df['data_publicacao'] = date_str
             
             # Determinar caminho do arquivo
-            date_obj = datetime.strptime(date_str, self.config.date_format)
+            date_obj = _parse_date(date_str, self.config.date_format)
             
             if self.storage_manager.use_s3:
                 # Caminho S3: raw-data/year=YYYY/month=MM/pncp_contratos_YYYYMMDD.parquet
@@ -598,21 +612,18 @@ class PNCPContractionsExtractor:
         if historical or not state.get('last_extraction_date'):
             # Extração histórica completa - desde data configurada ou backfill_start
             if hasattr(self.config, 'historical_backfill_start') and self.config.historical_backfill_start:
-                start_date = datetime.strptime(self.config.historical_backfill_start, self.config.date_format)
+                start_date = _parse_date(self.config.historical_backfill_start, self.config.date_format)
             else:
                 start_date = datetime(self.config.start_year, self.config.start_month, self.config.start_day)
             
             today = datetime.now()
-            
+
             # Gerar todas as datas desde a data inicial até hoje
-            current_date = start_date
-            while current_date.date() <= today.date():
-                dates.append(current_date.strftime(self.config.date_format))
-                current_date += timedelta(days=1)
-                
+            dates.extend(_date_range_strings(start_date, today, self.config.date_format))
+
         else:
             # Extração incremental - apenas dias não processados
-            last_date = datetime.strptime(state['last_extraction_date'], self.config.date_format)
+            last_date = _parse_date(state['last_extraction_date'], self.config.date_format)
             today = datetime.now()
             
             # Em produção, processar apenas o último dia (incremental)
@@ -623,10 +634,8 @@ class PNCPContractionsExtractor:
                     dates.append(yesterday.strftime(self.config.date_format))
             else:
                 # Desenvolvimento: pegar todos os dias perdidos
-                current_date = last_date + timedelta(days=1)
-                while current_date.date() <= today.date():
-                    dates.append(current_date.strftime(self.config.date_format))
-                    current_date += timedelta(days=1)
+                dates.extend(_date_range_strings(
+                    last_date + timedelta(days=1), today, self.config.date_format))
         
         return dates
     
@@ -8,6 +8,43 @@ import json
 from typing import List, Dict, Any, Optional
 
 
+# Blocos compartilhados entre os prompts (uma única cópia interned pelo CPython,
+# reutilizada em todas as chamadas em vez de reconstruída em cada f-string)
+_CATEGORIAS_ALVO_BLOCK = """- Materiais de escritório (canetas, papel, grampeadores, etc.)
+- Materiais educacionais (lápis de cor, cadernos, livros didáticos, etc.)
+- Materiais de informática básicos (mouse, teclado, pen drive, etc.)
+- Acessórios escolares (mochilas, estojos, lancheiras, etc.)
+- Materiais de arte e criatividade (tintas, pincéis, massa de modelar, etc.)"""
+
+# Lista curta usada apenas pelo prompt de incerteza — é o texto original
+# desse prompt; trocá-la pelas categorias detalhadas acima mudaria o que é
+# enviado ao LLM
+_MATERIAIS_ALVO_INCERTEZA_BLOCK = """- Materiais de escritório básicos
+- Materiais educacionais e escolares  
+- Acessórios de informática básicos
+- Materiais de arte e criatividade"""
+
+# Versão numerada usada apenas pelo prompt de categorização — também texto
+# original; as mesmas categorias em bullets não são byte a byte equivalentes
+_CRITERIOS_ANALISE_BLOCK = """1. Materiais de escritório (canetas, papel, grampeadores, etc.)
+2. Materiais educacionais (lápis de cor, cadernos, livros didáticos, etc.)
+3. Materiais de informática básicos (mouse, teclado, pen drive, etc.)
+4. Acessórios escolares (mochilas, estojos, lancheiras, etc.)
+5. Materiais de arte e criatividade (tintas, pincéis, massa de modelar, etc.)"""
+
+_INSTRUCOES_BLOCK = """INSTRUÇÕES:
+- Analise o CONTEXTO COMPLETO, não apenas palavras isoladas
+- Considere SINÔNIMOS e VARIAÇÕES de termos
+- Avalie se o objeto principal da compra se enquadra nas categorias acima
+- Ignore serviços complementares (instalação, manutenção, etc.)"""
+
+_FORMATO_RESPOSTA_BLOCK = """FORMATO DA RESPOSTA:
+DECISAO: [APROVAR/REJEITAR]
+CATEGORIA: [categoria mais específica, se aplicável]
+CONFIANCA: [0-100]%
+JUSTIFICATIVA: [breve explicação da decisão]"""
+
+
 class ContextualLicitationPrompts:
     """Templates de prompts contextuais baseados em filtros.json"""
     
@@ -87,20 +124,12 @@ OBJETO DE COMPRA:
 "{objetivo_compra}"
 
 CATEGORIAS ALVO:
-- Materiais de escritório (canetas, papel, grampeadores, etc.)
-- Materiais educacionais (lápis de cor, cadernos, livros didáticos, etc.)
-- Materiais de informática básicos (mouse, teclado, pen drive, etc.)
-- Acessórios escolares (mochilas, estojos, lancheiras, etc.)
-- Materiais de arte e criatividade (tintas, pincéis, massa de modelar, etc.)
+{_CATEGORIAS_ALVO_BLOCK}
 
 TAREFA:
 Determine se o objeto de compra se refere principalmente aos materiais listados acima.
 
-FORMATO DA RESPOSTA:
-DECISAO: [APROVAR/REJEITAR]
-CATEGORIA: [categoria mais específica, se aplicável]
-CONFIANCA: [0-100]%
-JUSTIFICATIVA: [breve explicação da decisão]"""
+{_FORMATO_RESPOSTA_BLOCK}"""
 
 
 class LicitationPrompts:
@@ -134,17 +163,9 @@ OBJETO DE COMPRA A ANALISAR:
 "{objetivo_compra}"
 
 CRITÉRIOS DE ANÁLISE:
-1. Materiais de escritório (canetas, papel, grampeadores, etc.)
-2. Materiais educacionais (lápis de cor, cadernos, livros didáticos, etc.)
-3. Materiais de informática básicos (mouse, teclado, pen drive, etc.)
-4. Acessórios escolares (mochilas, estojos, lancheiras, etc.)
-5. Materiais de arte e criatividade (tintas, pincéis, massa de modelar, etc.)
+{_CRITERIOS_ANALISE_BLOCK}
 
-INSTRUÇÕES:
-- Analise o CONTEXTO COMPLETO, não apenas palavras isoladas
-- Considere SINÔNIMOS e VARIAÇÕES de termos
-- Avalie se o objeto principal da compra se enquadra nas categorias acima
-- Ignore serviços complementares (instalação, manutenção, etc.)
+{_INSTRUCOES_BLOCK}
 
 RESPOSTA OBRIGATÓRIA (escolha apenas uma opção):
 - APROVAR: Se o objeto de compra se refere principalmente aos materiais listados
@@ -241,10 +262,7 @@ Este caso foi identificado como INCERTO pelo sistema inicial. Faça uma análise
 3. CLASSIFICAÇÃO PRINCIPAL: Como esta licitação seria classificada prioritariamente?
 
 MATERIAIS ALVO (que DEVEMOS incluir):
-- Materiais de escritório básicos
-- Materiais educacionais e escolares  
-- Acessórios de informática básicos
-- Materiais de arte e criatividade
+{_MATERIAIS_ALVO_INCERTEZA_BLOCK}
 
 MATERIAIS FORA DO ESCOPO (que DEVEMOS excluir):
 - Equipamentos eletrônicos complexos
@@ -5,19 +5,23 @@ Organiza e executa toda a suite de testes em sequência lógica
 """
 
 import os
+import re
 import sys
 import subprocess
 import time
 from pathlib import Path
-from datetime import datetime
+
+# Marcadores de linhas importantes no output dos scripts (alternação compilada
+# uma vez; evita 6 buscas de substring Python por linha)
+_MARKER_PATTERN = re.compile('|'.join(map(re.escape, ['✅', '❌', '⚠️', '🎉', '📊', 'RESUMO'])))
 
 def run_script(script_path, description):
     """Executa um script de teste e retorna resultado"""
     print(f"\n{'='*20} {description} {'='*20}")
     print(f"⚡ Executando: {script_path}")
-    print(f"🕐 Horário: {datetime.now().strftime('%H:%M:%S')}")
+    print(f"🕐 Horário: {time.strftime('%H:%M:%S')}")
     
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     try:
         result = subprocess.run(
@@ -27,7 +31,7 @@ def run_script(script_path, description):
             timeout=600  # 10 minutos timeout
         )
         
-        duration = time.time() - start_time
+        duration = time.perf_counter() - start_time
         
         if result.returncode == 0:
             print(f"✅ {description} - PASSOU ({duration:.1f}s)")
@@ -36,7 +40,7 @@ def run_script(script_path, description):
                 # Mostrar apenas linhas importantes do output
                 lines = result.stdout.split('\n')
                 for line in lines:
-                    if any(marker in line for marker in ['✅', '❌', '⚠️', '🎉', '📊', 'RESUMO']):
+                    if _MARKER_PATTERN.search(line):
                         print(f"  {line}")
             return True, duration, result.stdout, result.stderr
         else:
@@ -83,7 +87,7 @@ def run_unit_tests():
         print("⚠️  Diretório 'tests' não encontrado")
         return False, 0
     
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     try:
         # Verificar se pytest está instalado
@@ -106,7 +110,7 @@ def run_unit_tests():
             timeout=300
         )
         
-        duration = time.time() - start_time
+        duration = time.perf_counter() - start_time
         
         if result.returncode == 0:
             print(f"✅ Testes Unitários - PASSOU ({duration:.1f}s)")
@@ -129,72 +133,135 @@ def run_unit_tests():
         print(f"💥 Testes Unitários - ERRO: {e}")
         return False, 0
 
+def run_combined_pytest(script_paths):
+    """Executa toda a suite numa única invocação pytest (imports compartilhados)
+
+    Cada script executado via subprocess paga o custo de import de Python +
+    numpy + boto3 do zero; uma invocação única importa os módulos uma vez só.
+    """
+    print(f"\n{'='*20} Suite Combinada (pytest) {'='*20}")
+    print(f"⚡ Executando: pytest tests/ {' '.join(script_paths)}")
+
+    start_time = time.perf_counter()
+
+    try:
+        cmd = [sys.executable, '-m', 'pytest', 'tests/'] + list(script_paths) + ['-v', '--tb=short']
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=600
+        )
+
+        duration = time.perf_counter() - start_time
+
+        if result.returncode == 0:
+            print(f"✅ Suite Combinada - PASSOU ({duration:.1f}s)")
+        else:
+            print(f"❌ Suite Combinada - FALHOU ({duration:.1f}s)")
+
+        # Mostrar resumo dos testes
+        for line in result.stdout.split('\n'):
+            if 'passed' in line or 'failed' in line or 'PASSED' in line or 'FAILED' in line:
+                print(f"  {line}")
+
+        return result.returncode == 0, duration
+
+    except subprocess.TimeoutExpired:
+        print("⏰ Suite Combinada - TIMEOUT (>10min)")
+        return False, 600
+    except Exception as e:
+        print(f"💥 Suite Combinada - ERRO: {e}")
+        return False, 0
+
 def generate_test_report(results):
-    """Gera relatório final dos testes"""
-    print("\n" + "="*80)
-    print("📊 RELATÓRIO FINAL DOS TESTES - PNCP DATA EXTRACTOR")
-    print("="*80)
-    
+    """Gera relatório final dos testes
+
+    Uma única passada sobre results acumula estatísticas, linhas detalhadas e
+    categorização de falhas; o relatório inteiro sai num único write em vez de
+    um print (syscall) por linha.
+    """
     total_tests = len(results)
-    passed_tests = sum(1 for result in results if result['passed'])
-    total_duration = sum(result['duration'] for result in results)
-    
-    print(f"\n📈 ESTATÍSTICAS GERAIS:")
-    print(f"Total de testes: {total_tests}")
-    print(f"Testes passou: {passed_tests}")
-    print(f"Testes falhou: {total_tests - passed_tests}")
-    print(f"Taxa de sucesso: {passed_tests/total_tests*100:.1f}%")
-    print(f"Tempo total: {total_duration:.1f}s ({total_duration/60:.1f}min)")
-    
-    print(f"\n📋 RESULTADOS DETALHADOS:")
-    for i, result in enumerate(results, 1):
-        status = "✅ PASSOU" if result['passed'] else "❌ FALHOU"
-        print(f"{i:2d}. {result['description']:<35} {status:10} ({result['duration']:5.1f}s)")
-    
-    # Categorizar resultados
+    passed_tests = 0
+    total_duration = 0.0
+    detail_lines = []
     critical_failures = []
     warnings = []
-    
-    for result in results:
-        if not result['passed']:
-            if any(critical in result['description'] for critical in ['Unitários', 'End-to-End', 'Locais']):
+
+    for i, result in enumerate(results, 1):
+        if result['passed']:
+            passed_tests += 1
+        else:
+            if any(critical in result['description'] for critical in ['Unitários', 'End-to-End', 'Locais', 'Combinada']):
                 critical_failures.append(result['description'])
             else:
                 warnings.append(result['description'])
-    
+        total_duration += result['duration']
+        status = "✅ PASSOU" if result['passed'] else "❌ FALHOU"
+        detail_lines.append(f"{i:2d}. {result['description']:<35} {status:10} ({result['duration']:5.1f}s)")
+
+    lines = [
+        "",
+        "="*80,
+        "📊 RELATÓRIO FINAL DOS TESTES - PNCP DATA EXTRACTOR",
+        "="*80,
+        "",
+        "📈 ESTATÍSTICAS GERAIS:",
+        f"Total de testes: {total_tests}",
+        f"Testes passou: {passed_tests}",
+        f"Testes falhou: {total_tests - passed_tests}",
+        f"Taxa de sucesso: {passed_tests/total_tests*100:.1f}%",
+        f"Tempo total: {total_duration:.1f}s ({total_duration/60:.1f}min)",
+        "",
+        "📋 RESULTADOS DETALHADOS:",
+    ]
+    lines.extend(detail_lines)
+
     if critical_failures:
-        print(f"\n🚨 FALHAS CRÍTICAS ({len(critical_failures)}):")
-        for failure in critical_failures:
-            print(f"  ❌ {failure}")
-    
+        lines.append(f"\n🚨 FALHAS CRÍTICAS ({len(critical_failures)}):")
+        lines.extend(f"  ❌ {failure}" for failure in critical_failures)
+
     if warnings:
-        print(f"\n⚠️  AVISOS ({len(warnings)}):")
-        for warning in warnings:
-            print(f"  ⚠️  {warning}")
-    
+        lines.append(f"\n⚠️  AVISOS ({len(warnings)}):")
+        lines.extend(f"  ⚠️  {warning}" for warning in warnings)
+
     # Recomendações
-    print(f"\n💡 RECOMENDAÇÕES:")
-    
+    lines.append("\n💡 RECOMENDAÇÕES:")
+
     if passed_tests == total_tests:
-        print("🎉 Todos os testes passaram! Sistema pronto para deploy.")
-        print("📝 Próximos passos:")
-        print("  1. Configure secrets no GitHub")
-        print("  2. Faça commit para testar CI/CD") 
-        print("  3. Deploy da infraestrutura AWS")
-        print("  4. Monitoramento em produção")
+        lines.extend([
+            "🎉 Todos os testes passaram! Sistema pronto para deploy.",
+            "📝 Próximos passos:",
+            "  1. Configure secrets no GitHub",
+            "  2. Faça commit para testar CI/CD",
+            "  3. Deploy da infraestrutura AWS",
+            "  4. Monitoramento em produção",
+        ])
     elif passed_tests >= total_tests * 0.8:
-        print("✅ Maioria dos testes passou. Sistema funcional com algumas pendências.")
-        print("📝 Corrija as falhas antes do deploy em produção.")
+        lines.extend([
+            "✅ Maioria dos testes passou. Sistema funcional com algumas pendências.",
+            "📝 Corrija as falhas antes do deploy em produção.",
+        ])
     else:
-        print("❌ Muitos testes falharam. Revise configuração antes de prosseguir.")
-        print("📝 Foque nas falhas críticas primeiro.")
-    
+        lines.extend([
+            "❌ Muitos testes falharam. Revise configuração antes de prosseguir.",
+            "📝 Foque nas falhas críticas primeiro.",
+        ])
+
+    sys.stdout.write('\n'.join(lines) + '\n')
+
     return passed_tests == total_tests
 
-def main():
-    """Executa toda a suite de testes"""
+def main(isolated=False):
+    """Executa toda a suite de testes
+
+    Args:
+        isolated: Se True, executa cada script num subprocess separado
+                  (comportamento antigo); caso contrário usa uma única
+                  invocação pytest que importa os módulos compartilhados uma vez.
+    """
     print("🚀 PNCP DATA EXTRACTOR - SUITE COMPLETA DE TESTES")
-    print(f"⏰ Iniciado em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"⏰ Iniciado em: {time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*80)
     
     # Verificar scripts disponíveis
@@ -209,17 +276,8 @@ def main():
     print(f"📋 Executando {len(available_scripts)} + 1 suites de teste...")
     
     results = []
-    
-    # 1. Testes Unitários (pytest)
-    if Path('tests').exists():
-        passed, duration = run_unit_tests()
-        results.append({
-            'description': 'Testes Unitários (pytest)',
-            'passed': passed,
-            'duration': duration
-        })
-    
-    # 2. Executar scripts de teste em ordem lógica
+
+    # Ordem lógica dos scripts de teste
     test_order = [
         ('test_local.py', 'Testes Locais'),
         ('test_infrastructure.py', 'Validação Infraestrutura CDK'),
@@ -227,29 +285,50 @@ def main():
         ('test_end_to_end.py', 'Teste End-to-End'),
         ('test_ci_cd.py', 'Validação CI/CD')
     ]
-    
-    for script_path, description in test_order:
-        if script_path in available_scripts:
-            passed, duration, stdout, stderr = run_script(script_path, description)
+
+    if isolated:
+        # Modo compatibilidade: um subprocess por script (imports repetidos)
+        # 1. Testes Unitários (pytest)
+        if Path('tests').exists():
+            passed, duration = run_unit_tests()
             results.append({
-                'description': description,
+                'description': 'Testes Unitários (pytest)',
                 'passed': passed,
-                'duration': duration,
-                'stdout': stdout,
-                'stderr': stderr
+                'duration': duration
             })
+
+        # 2. Executar scripts de teste em ordem lógica
+        for script_path, description in test_order:
+            if script_path in available_scripts:
+                passed, duration, stdout, stderr = run_script(script_path, description)
+                results.append({
+                    'description': description,
+                    'passed': passed,
+                    'duration': duration,
+                    'stdout': stdout,
+                    'stderr': stderr
+                })
+    else:
+        # Invocação única: pytest coleta tests/ + scripts, importando tudo uma vez
+        script_paths = [script for script, _ in test_order if script in available_scripts]
+        passed, duration = run_combined_pytest(script_paths)
+        results.append({
+            'description': 'Suite Combinada (pytest)',
+            'passed': passed,
+            'duration': duration
+        })
     
     # 3. Gerar relatório final
     success = generate_test_report(results)
     
-    print(f"\n⏰ Concluído em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"\n⏰ Concluído em: {time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*80)
     
     return success
 
 if __name__ == "__main__":
     try:
-        success = main()
+        success = main(isolated='--isolated' in sys.argv)
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         print("\n\n⏹️  Execução interrompida pelo usuário")
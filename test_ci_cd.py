@@ -5,17 +5,38 @@ Verifica configuração do GitHub Actions e prepara commit de teste
 """
 
 import os
+import re
 import sys
 import json
 import subprocess
+from functools import lru_cache
 from pathlib import Path
 
+@lru_cache(maxsize=None)
+def _read_file_cached(path_str):
+    """Lê um arquivo uma única vez por execução (vários testes releem os mesmos)"""
+    return Path(path_str).read_text(encoding='utf-8')
+
+def _find_elements(content, elements):
+    """Retorna o subconjunto de elements presente em content
+
+    Uma alternação compilada faz uma única passada linear sobre o texto em
+    vez de uma busca de substring Python por elemento.
+    """
+    # Alternativas mais longas primeiro, para que prefixos (ex.: 'COPY') não
+    # escondam elementos mais específicos (ex.: 'COPY requirements.txt')
+    ordered = sorted(elements, key=len, reverse=True)
+    pattern = re.compile('|'.join(map(re.escape, ordered)))
+    found = set(pattern.findall(content))
+    # Um elemento contido num match mais longo também está presente no texto
+    return {e for e in elements if e in found or any(e in f for f in found)}
+
 def run_command(command, cwd=None):
-    """Executa comando e retorna resultado"""
+    """Executa comando (lista argv, sem shell) e retorna resultado"""
     try:
         result = subprocess.run(
             command,
-            shell=True,
+            shell=False,
             cwd=cwd,
             capture_output=True,
             text=True,
@@ -31,34 +52,32 @@ def test_git_configuration():
     """Testa configuração do Git"""
     print("🧪 Testando configuração Git...")
     
-    # Verificar se estamos em um repositório Git
-    success, stdout, stderr = run_command("git status")
+    # Uma única chamada traz status + branch + upstream (em vez de três
+    # fork/exec de git status, git remote -v e git branch --show-current)
+    success, stdout, stderr = run_command(['git', 'status', '--porcelain=v2', '--branch'])
     if not success:
         print("❌ Não é um repositório Git ou Git não instalado")
         return False
-    
+
     print("✅ Repositório Git detectado")
-    
-    # Verificar remote origin
-    success, stdout, stderr = run_command("git remote -v")
-    if not success:
-        print("❌ Erro ao verificar remote")
-        return False
-    
-    if 'origin' in stdout:
+
+    current_branch = None
+    upstream = None
+    for line in stdout.split('\n'):
+        if line.startswith('# branch.head '):
+            current_branch = line.split(' ', 2)[2]
+        elif line.startswith('# branch.upstream '):
+            upstream = line.split(' ', 2)[2]
+
+    if upstream:
         print("✅ Remote origin configurado")
-        for line in stdout.split('\n'):
-            if 'origin' in line and 'fetch' in line:
-                print(f"  {line.strip()}")
+        print(f"  upstream: {upstream}")
     else:
         print("⚠️  Remote origin não configurado")
-    
-    # Verificar branch atual
-    success, stdout, stderr = run_command("git branch --show-current")
-    if success:
-        current_branch = stdout.strip()
+
+    if current_branch:
         print(f"✅ Branch atual: {current_branch}")
-    
+
     return True
 
 def test_github_actions_workflow():
@@ -74,9 +93,8 @@ def test_github_actions_workflow():
     print("✅ Arquivo de workflow existe")
     
     try:
-        with open(workflow_path, 'r', encoding='utf-8') as f:
-            workflow_content = f.read()
-        
+        workflow_content = _read_file_cached(str(workflow_path))
+
         # Verificar elementos essenciais do workflow
         essential_elements = [
             'name:',
@@ -91,10 +109,11 @@ def test_github_actions_workflow():
             'docker build',
             'cdk deploy'
         ]
-        
+
+        found = _find_elements(workflow_content, essential_elements)
         missing_elements = []
         for element in essential_elements:
-            if element not in workflow_content:
+            if element not in found:
                 missing_elements.append(element)
                 print(f"❌ Elemento faltando: {element}")
             else:
@@ -124,9 +143,8 @@ def test_dockerfile():
     print("✅ Dockerfile existe")
     
     try:
-        with open(dockerfile_path, 'r', encoding='utf-8') as f:
-            dockerfile_content = f.read()
-        
+        dockerfile_content = _read_file_cached(str(dockerfile_path))
+
         # Verificar elementos essenciais
         essential_elements = [
             'FROM python',
@@ -137,9 +155,10 @@ def test_dockerfile():
             'CMD',
             'USER'  # Para segurança
         ]
-        
+
+        found = _find_elements(dockerfile_content, essential_elements)
         for element in essential_elements:
-            if element in dockerfile_content:
+            if element in found:
                 print(f"✅ {element}")
             else:
                 print(f"❌ {element}")
@@ -164,9 +183,8 @@ def test_requirements_file():
     print("✅ requirements.txt existe")
     
     try:
-        with open(requirements_path, 'r', encoding='utf-8') as f:
-            requirements = f.read()
-        
+        requirements = _read_file_cached(str(requirements_path))
+
         # Verificar dependências essenciais
         essential_packages = [
             'requests',
@@ -175,9 +193,10 @@ def test_requirements_file():
             'openai',
             'python-dotenv'
         ]
-        
+
+        found = _find_elements(requirements, essential_packages)
         for package in essential_packages:
-            if package in requirements:
+            if package in found:
                 print(f"✅ {package}")
             else:
                 print(f"❌ {package}")
@@ -366,6 +385,18 @@ def run_ci_cd_validation():
     
     return passed >= len(results) * 0.8  # 80% deve estar OK
 
+# Helpers dirigidos por run_ci_cd_validation; __test__ = False impede a
+# coleta duplicada pelo pytest na invocação única da suite
+for _test_fn in (test_git_configuration, test_github_actions_workflow,
+                 test_dockerfile, test_requirements_file,
+                 test_infrastructure_structure,
+                 test_github_secrets_configuration):
+    _test_fn.__test__ = False
+
+def test_main():
+    """Wrapper pytest - permite coletar este script na invocação única da suite"""
+    assert run_ci_cd_validation()
+
 if __name__ == "__main__":
     success = run_ci_cd_validation()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -5,11 +5,15 @@ Simula execução completa do sistema de extração
 """
 
 import os
+import re
 import sys
 import json
+import time
 import boto3
 import pandas as pd
+import pyarrow.parquet as pq
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -19,6 +23,23 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from storage_manager import StorageManager
 from aws_config import AwsConfig
 
+# Sessão boto3 compartilhada: resolução de credenciais e pool de conexões
+# HTTP acontecem uma vez por processo, não uma vez por cliente
+_AWS_SESSION = boto3.Session()
+
+# Critérios de filtro simulados (substituindo LLM real) — lista e alternação
+# compiladas uma única vez no import, não a cada chamada do filtro
+# (alternativas mais longas primeiro, para que 'bi' não esconda
+# 'business intelligence'; cada objeto é varrido numa única passada)
+_TECH_KEYWORDS = [
+    'informática', 'sistema', 'digital', 'software', 'tecnologia',
+    'business intelligence', 'analytics', 'bi', 'dados', 'plataforma'
+]
+_TECH_RE = re.compile(
+    '|'.join(map(re.escape, sorted(_TECH_KEYWORDS, key=len, reverse=True))),
+    re.IGNORECASE
+)
+
 def setup_test_environment():
     """Configura ambiente de teste"""
     print("🔧 Configurando ambiente de teste...")
@@ -42,87 +63,79 @@ def setup_test_environment():
         print(f"❌ Erro na configuração: {e}")
         return False
 
+# Dados simulados da API PNCP — DataFrame materializado uma única vez no
+# import; a inferência de schema e construção do BlockManager dominam o
+# custo para DataFrames pequenos
+_MOCK_DATA = [
+    {
+        "numeroContrato": "001/2024",
+        "objetoContrato": "Aquisição de equipamentos de informática para digitalização",
+        "valorContrato": 125000.50,
+        "dataAssinatura": "2024-01-15",
+        "nomeRazaoSocialFornecedor": "TechCorp Solutions LTDA",
+        "modalidadeLicitacao": "PREGÃO ELETRÔNICO"
+    },
+    {
+        "numeroContrato": "002/2024",
+        "objetoContrato": "Desenvolvimento de sistema de gestão digital integrada",
+        "valorContrato": 280000.00,
+        "dataAssinatura": "2024-01-20",
+        "nomeRazaoSocialFornecedor": "DevSoft Inovação S.A.",
+        "modalidadeLicitacao": "PREGÃO ELETRÔNICO"
+    },
+    {
+        "numeroContrato": "003/2024",
+        "objetoContrato": "Serviços de limpeza e conservação predial",
+        "valorContrato": 45000.00,
+        "dataAssinatura": "2024-01-22",
+        "nomeRazaoSocialFornecedor": "CleanCorp Serviços",
+        "modalidadeLicitacao": "TOMADA DE PREÇOS"
+    },
+    {
+        "numeroContrato": "004/2024",
+        "objetoContrato": "Implantação de plataforma de Business Intelligence e Analytics",
+        "valorContrato": 350000.00,
+        "dataAssinatura": "2024-01-25",
+        "nomeRazaoSocialFornecedor": "DataTech Analytics LTDA",
+        "modalidadeLicitacao": "CONCORRÊNCIA PÚBLICA"
+    }
+]
+_MOCK_DF = pd.DataFrame(_MOCK_DATA)
+
 def test_pncp_api_simulation():
     """Simula extração da API PNCP"""
     print("🧪 Testando simulação da API PNCP...")
-    
-    # Dados simulados da API PNCP
-    mock_data = [
-        {
-            "numeroContrato": "001/2024",
-            "objetoContrato": "Aquisição de equipamentos de informática para digitalização",
-            "valorContrato": 125000.50,
-            "dataAssinatura": "2024-01-15",
-            "nomeRazaoSocialFornecedor": "TechCorp Solutions LTDA",
-            "modalidadeLicitacao": "PREGÃO ELETRÔNICO"
-        },
-        {
-            "numeroContrato": "002/2024", 
-            "objetoContrato": "Desenvolvimento de sistema de gestão digital integrada",
-            "valorContrato": 280000.00,
-            "dataAssinatura": "2024-01-20",
-            "nomeRazaoSocialFornecedor": "DevSoft Inovação S.A.",
-            "modalidadeLicitacao": "PREGÃO ELETRÔNICO"
-        },
-        {
-            "numeroContrato": "003/2024",
-            "objetoContrato": "Serviços de limpeza e conservação predial",
-            "valorContrato": 45000.00,
-            "dataAssinatura": "2024-01-22",
-            "nomeRazaoSocialFornecedor": "CleanCorp Serviços",
-            "modalidadeLicitacao": "TOMADA DE PREÇOS"
-        },
-        {
-            "numeroContrato": "004/2024",
-            "objetoContrato": "Implantação de plataforma de Business Intelligence e Analytics",
-            "valorContrato": 350000.00,
-            "dataAssinatura": "2024-01-25",
-            "nomeRazaoSocialFornecedor": "DataTech Analytics LTDA",
-            "modalidadeLicitacao": "CONCORRÊNCIA PÚBLICA"
-        }
-    ]
-    
-    print(f"✅ {len(mock_data)} contratos simulados da API PNCP")
-    return pd.DataFrame(mock_data)
+
+    print(f"✅ {len(_MOCK_DF)} contratos simulados da API PNCP")
+    # Cópia rasa basta: o pipeline downstream só lê os dados
+    return _MOCK_DF.copy(deep=False)
 
 def test_llm_filter_simulation(contracts_df):
     """Simula filtro LLM para contratos de TI"""
     print("🧪 Testando simulação do filtro LLM...")
     
-    # Critérios de filtro simulados (substituindo LLM real)
-    tech_keywords = [
-        'informática', 'sistema', 'digital', 'software', 'tecnologia',
-        'business intelligence', 'analytics', 'bi', 'dados', 'plataforma'
-    ]
-    
-    filtered_contracts = []
-    filter_results = []
-    
-    for idx, contract in contracts_df.iterrows():
-        objeto_lower = contract['objetoContrato'].lower()
-        valor = contract['valorContrato']
-        
-        # Simular decisão do LLM
-        is_tech_related = any(keyword in objeto_lower for keyword in tech_keywords)
-        is_high_value = valor >= 100000  # Contratos acima de R$ 100k
-        
-        should_include = is_tech_related and is_high_value
-        
-        filter_result = {
-            'numero_contrato': contract['numeroContrato'],
-            'objeto': contract['objetoContrato'],
-            'valor': valor,
-            'tech_related': is_tech_related,
-            'high_value': is_high_value,
-            'approved': should_include,
-            'reasoning': f"TI: {is_tech_related}, Alto valor: {is_high_value}"
-        }
-        
-        filter_results.append(filter_result)
-        
-        if should_include:
-            filtered_contracts.append(contract.to_dict())
-    
+    # Avaliação vetorizada: uma passada sobre as colunas em vez de
+    # iterrows() + laço Python de keywords por linha
+    tech_mask = contracts_df['objetoContrato'].str.contains(_TECH_RE, regex=True)
+    value_mask = contracts_df['valorContrato'] >= 100000  # Contratos acima de R$ 100k
+    approved_mask = tech_mask & value_mask
+
+    # Resultados construídos coluna a coluna (reasoning incluso, via
+    # concatenação vetorizada de strings); a conversão para lista de dicts
+    # acontece uma única vez, na fronteira com o printout/retorno
+    results_df = pd.DataFrame({
+        'numero_contrato': contracts_df['numeroContrato'],
+        'objeto': contracts_df['objetoContrato'],
+        'valor': contracts_df['valorContrato'],
+        'tech_related': tech_mask,
+        'high_value': value_mask,
+        'approved': approved_mask,
+        'reasoning': 'TI: ' + tech_mask.astype(str) + ', Alto valor: ' + value_mask.astype(str),
+    })
+    filter_results = results_df.to_dict('records')
+
+    filtered_contracts = contracts_df[approved_mask].to_dict('records')
+
     print(f"📊 Resultados do filtro LLM:")
     for result in filter_results:
         status = "✅ APROVADO" if result['approved'] else "❌ REJEITADO"
@@ -135,24 +148,33 @@ def test_llm_filter_simulation(contracts_df):
     
     return filtered_df, filter_results
 
+def _save_with_retry(save_func, *args, attempts=3):
+    """Executa um salvamento com retry e backoff exponencial (2**tentativa)
+
+    Endurece contra 5xx transientes do S3 sem mascarar erros persistentes.
+    """
+    for attempt in range(attempts):
+        try:
+            return save_func(*args)
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(2 ** attempt)
+
 def test_data_storage(filtered_df):
-    """Testa armazenamento dos dados filtrados"""
+    """Testa armazenamento dos dados filtrados
+
+    Os três salvamentos (bruto, consolidado, logs) são independentes e
+    limitados por I/O; submetidos juntos a um pool de threads, o tempo
+    total vira max(t_bruto, t_consolidado, t_logs) em vez da soma.
+    """
     print("🧪 Testando armazenamento de dados...")
-    
+
     try:
         storage = StorageManager()
         test_date = datetime.now()
-        
+
         if len(filtered_df) > 0:
-            # Salvar dados brutos
-            raw_file = storage.save_to_parquet(filtered_df, test_date)
-            print(f"✅ Dados brutos salvos: {raw_file}")
-            
-            # Salvar dados consolidados
-            consolidated_file = storage.save_consolidated(filtered_df, test_date)
-            print(f"✅ Dados consolidados salvos: {consolidated_file}")
-            
-            # Salvar logs
             log_data = {
                 'timestamp': datetime.now().isoformat(),
                 'execution_date': test_date.strftime('%Y-%m-%d'),
@@ -162,15 +184,26 @@ def test_data_storage(filtered_df):
                 'test_mode': True,
                 'success': True
             }
-            
-            log_file = storage.save_logs_json(log_data, test_date)
-            print(f"✅ Logs salvos: {log_file}")
-            
+
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                f_raw = pool.submit(_save_with_retry, storage.save_to_parquet, filtered_df, test_date)
+                f_cons = pool.submit(_save_with_retry, storage.save_consolidated, filtered_df, test_date)
+                f_log = pool.submit(_save_with_retry, storage.save_logs_json, log_data, test_date)
+
+                raw_file = f_raw.result()
+                print(f"✅ Dados brutos salvos: {raw_file}")
+
+                consolidated_file = f_cons.result()
+                print(f"✅ Dados consolidados salvos: {consolidated_file}")
+
+                log_file = f_log.result()
+                print(f"✅ Logs salvos: {log_file}")
+
             return True, raw_file, consolidated_file, log_file
         else:
             print("⚠️  Nenhum dado para armazenar")
             return False, None, None, None
-            
+
     except Exception as e:
         print(f"❌ Erro no armazenamento: {e}")
         return False, None, None, None
@@ -186,8 +219,9 @@ def test_file_validation(raw_file, consolidated_file):
                 print(f"✅ Arquivo raw no S3: {raw_file}")
             else:
                 if os.path.exists(raw_file):
-                    df_raw = pd.read_parquet(raw_file)
-                    print(f"✅ Arquivo raw válido: {len(df_raw)} registros")
+                    # Só o footer do Parquet é lido — sem decodificar colunas
+                    n_raw = pq.read_metadata(raw_file).num_rows
+                    print(f"✅ Arquivo raw válido: {n_raw} registros")
                 else:
                     print(f"❌ Arquivo raw não encontrado: {raw_file}")
                     return False
@@ -197,8 +231,8 @@ def test_file_validation(raw_file, consolidated_file):
                 print(f"✅ Arquivo consolidado no S3: {consolidated_file}")
             else:
                 if os.path.exists(consolidated_file):
-                    df_cons = pd.read_parquet(consolidated_file)
-                    print(f"✅ Arquivo consolidado válido: {len(df_cons)} registros")
+                    n_cons = pq.read_metadata(consolidated_file).num_rows
+                    print(f"✅ Arquivo consolidado válido: {n_cons} registros")
                 else:
                     print(f"❌ Arquivo consolidado não encontrado: {consolidated_file}")
                     return False
@@ -221,17 +255,19 @@ def test_step_functions_simulation():
             print("ℹ️  Modo local - Step Functions não disponível")
             return True
         
-        sf_client = boto3.client('stepfunctions')
-        
-        # Procurar state machine do projeto
-        response = sf_client.list_state_machines()
+        sf_client = _AWS_SESSION.client('stepfunctions')
+
+        # Procurar state machine do projeto — paginador com short-circuit
+        # no primeiro match, sem carregar a lista completa
         project_sm = None
-        
-        for sm in response['stateMachines']:
-            if 'pncp-extractor' in sm['name']:
-                project_sm = sm
+        for page in sf_client.get_paginator('list_state_machines').paginate():
+            for sm in page['stateMachines']:
+                if 'pncp-extractor' in sm['name']:
+                    project_sm = sm
+                    break
+            if project_sm:
                 break
-        
+
         if project_sm:
             print(f"✅ State Machine encontrada: {project_sm['name']}")
             
@@ -282,18 +318,26 @@ def test_monitoring_simulation():
         return False
 
 def cleanup_test_files(*file_paths):
-    """Remove arquivos de teste"""
+    """Remove arquivos de teste
+
+    unlink(missing_ok=True) resolve existência + remoção num único syscall
+    (em vez de exists() + remove), e as remoções rodam em paralelo — cada
+    unlink é I/O independente.
+    """
     print("🧹 Limpando arquivos de teste...")
-    
-    for file_path in file_paths:
-        if file_path and not file_path.startswith('s3://'):
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    print(f"✅ Removido: {file_path}")
-            except Exception as e:
-                print(f"⚠️  Erro ao remover {file_path}: {e}")
-    
+
+    def remove(file_path):
+        try:
+            Path(file_path).unlink(missing_ok=True)
+            print(f"✅ Removido: {file_path}")
+        except Exception as e:
+            print(f"⚠️  Erro ao remover {file_path}: {e}")
+
+    local_paths = [p for p in file_paths if p and not p.startswith('s3://')]
+    if local_paths:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(remove, local_paths))
+
     print("✅ Limpeza concluída")
 
 def test_extractor_execution():
@@ -401,6 +445,19 @@ def run_end_to_end_test():
         print(f"❌ Erro durante teste end-to-end: {e}")
         return False
 
+# Helpers dirigidos por run_end_to_end_test (vários recebem parâmetros e
+# virariam erro de fixture no pytest); __test__ = False impede a coleta
+# duplicada na invocação única da suite
+for _test_fn in (test_pncp_api_simulation, test_llm_filter_simulation,
+                 test_data_storage, test_file_validation,
+                 test_step_functions_simulation, test_monitoring_simulation,
+                 test_extractor_execution):
+    _test_fn.__test__ = False
+
+def test_main():
+    """Wrapper pytest - permite coletar este script na invocação única da suite"""
+    assert run_end_to_end_test()
+
 if __name__ == "__main__":
     success = run_end_to_end_test()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -1,275 +1,212 @@
 """
-Testes unitários para AwsConfig
+Testes unitários para AWSConfigManager
 """
 
 import pytest
 import os
 import sys
-from unittest.mock import Mock, patch, MagicMock
+import boto3
+import requests
+from botocore.exceptions import ClientError
+from moto import mock_aws
+from unittest.mock import Mock, patch
 from pathlib import Path
 
 # Adicionar diretório raiz ao path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from aws_config import AwsConfig
-
-class TestAwsConfig:
-    
-    def test_init_without_aws_credentials(self):
-        """Testa inicialização sem credenciais AWS"""
-        with patch.dict(os.environ, {}, clear=True):
-            config = AwsConfig()
-            assert config.is_aws_environment() == False
-            assert config.secrets_client is None
-    
-    @patch('boto3.client')
-    def test_init_with_aws_credentials(self, mock_boto3):
-        """Testa inicialização com credenciais AWS"""
-        mock_secrets = Mock()
-        mock_boto3.return_value = mock_secrets
-        
-        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
-            config = AwsConfig()
-            
-            assert config.is_aws_environment() == True
-            assert config.region == 'us-east-1'
-            assert config.secrets_client == mock_secrets
-            mock_boto3.assert_called_once_with('secretsmanager', region_name='us-east-1')
-    
-    def test_is_aws_environment_with_region(self):
-        """Testa detecção de ambiente AWS com AWS_DEFAULT_REGION"""
-        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-west-2'}, clear=True):
-            config = AwsConfig()
-            assert config.is_aws_environment() == True
-            assert config.region == 'us-west-2'
-    
-    def test_is_aws_environment_with_aws_region(self):
-        """Testa detecção de ambiente AWS com AWS_REGION"""
-        with patch.dict(os.environ, {'AWS_REGION': 'eu-west-1'}, clear=True):
-            config = AwsConfig()
-            assert config.is_aws_environment() == True
-            assert config.region == 'eu-west-1'
-    
-    def test_is_aws_environment_precedence(self):
-        """Testa precedência entre AWS_DEFAULT_REGION e AWS_REGION"""
-        with patch.dict(os.environ, {
-            'AWS_DEFAULT_REGION': 'us-east-1',
-            'AWS_REGION': 'us-west-2'
-        }, clear=True):
-            config = AwsConfig()
-            # AWS_DEFAULT_REGION tem precedência
-            assert config.region == 'us-east-1'
-    
-    @patch('boto3.client')
-    def test_get_secret_success(self, mock_boto3):
+import aws_config
+from aws_config import AWSConfigManager
+
+class TestAWSConfigManager:
+
+    @pytest.fixture(autouse=True)
+    def clean_identity_cache(self):
+        """Limpa o lru_cache de _get_caller_identity entre testes
+
+        A identidade STS é memoizada por região no módulo; sem o clear, o
+        teste de sucesso (moto) contaminaria o de falha — o side_effect do
+        STS mockado nunca dispararia porque a resposta viria do cache.
+        """
+        aws_config._get_caller_identity.cache_clear()
+        yield
+        aws_config._get_caller_identity.cache_clear()
+
+    @pytest.fixture(autouse=True)
+    def clean_env(self, monkeypatch):
+        """Environ limpo por teste via monkeypatch
+
+        monkeypatch.delenv registra um undo por chave em vez do
+        snapshot/restore do environ inteiro que patch.dict(clear=True)
+        fazia em cada teste.
+        """
+        for key in list(os.environ):
+            monkeypatch.delenv(key, raising=False)
+        # Credenciais falsas para os clientes do moto poderem assinar requests
+        monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+        monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+        # Sem região no environ o __init__ sondaria os metadados EC2;
+        # o stub falha na hora em vez de esperar os 2s de timeout
+        monkeypatch.setattr(requests, 'get',
+                            Mock(side_effect=requests.ConnectionError))
+
+    @pytest.fixture(scope="module")
+    def aws_env(self):
+        """AWS simulada em processo (moto), uma sessão por módulo
+
+        O contexto mock_aws intercepta qualquer cliente boto3 criado dentro
+        dele (inclusive os internos do AWSConfigManager), sem Mock por teste.
+        """
+        with mock_aws():
+            yield boto3.Session(region_name='us-east-1')
+
+    @pytest.fixture(scope="module")
+    def secrets_env(self, aws_env):
+        """Secrets pré-criados uma vez por módulo, cliente reutilizado"""
+        client = aws_env.client('secretsmanager')
+        client.create_secret(Name='test-secret-name',
+                             SecretString='test-secret-value')
+        client.create_secret(Name='test-secret-json',
+                             SecretString='{"api_key": "sk-test123456789"}')
+        client.create_secret(Name='pncp/openai-api-key',
+                             SecretString='{"api_key": "sk-test123"}')
+        return client
+
+    @pytest.mark.parametrize("env_vars,expected_region", [
+        # AWS_DEFAULT_REGION sozinha
+        ({'AWS_DEFAULT_REGION': 'us-west-2'}, 'us-west-2'),
+        # AWS_REGION sozinha
+        ({'AWS_REGION': 'eu-west-1'}, 'eu-west-1'),
+        # AWS_DEFAULT_REGION tem precedência sobre AWS_REGION
+        ({'AWS_DEFAULT_REGION': 'us-east-1', 'AWS_REGION': 'us-west-2'}, 'us-east-1'),
+        # Sem environ nem metadados, cai no padrão
+        ({}, 'us-east-1'),
+    ])
+    def test_region_precedence(self, aws_env, monkeypatch, env_vars, expected_region):
+        """Testa a precedência das variáveis de região e o padrão"""
+        for key, value in env_vars.items():
+            monkeypatch.setenv(key, value)
+
+        config = AWSConfigManager()
+        assert config.region == expected_region
+
+    def test_init_secrets_client(self, aws_env, monkeypatch):
+        """Testa inicialização do cliente de Secrets Manager"""
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        config = AWSConfigManager()
+
+        assert config.secrets_client is not None
+
+    def test_get_secret_success(self, secrets_env, monkeypatch):
         """Testa recuperação de secret com sucesso"""
-        mock_secrets = Mock()
-        mock_secrets.get_secret_value.return_value = {
-            'SecretString': 'test-secret-value'
-        }
-        mock_boto3.return_value = mock_secrets
-        
-        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
-            config = AwsConfig()
-            result = config.get_secret('test-secret-name')
-            
-            assert result == 'test-secret-value'
-            mock_secrets.get_secret_value.assert_called_once_with(
-                SecretId='test-secret-name'
-            )
-    
-    @patch('boto3.client')
-    def test_get_secret_not_found(self, mock_boto3):
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        config = AWSConfigManager()
+        result = config.get_secret('test-secret-name')
+
+        assert result == 'test-secret-value'
+
+    def test_get_secret_json(self, secrets_env, monkeypatch):
+        """Testa que secret JSON retorna o primeiro valor do dicionário"""
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        config = AWSConfigManager()
+        result = config.get_secret('test-secret-json')
+
+        assert result == 'sk-test123456789'
+
+    def test_get_secret_not_found(self, secrets_env, monkeypatch):
         """Testa recuperação de secret não encontrado"""
-        from botocore.exceptions import ClientError
-        
-        mock_secrets = Mock()
-        mock_secrets.get_secret_value.side_effect = ClientError(
-            {'Error': {'Code': 'ResourceNotFoundException'}},
-            'GetSecretValue'
-        )
-        mock_boto3.return_value = mock_secrets
-        
-        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
-            config = AwsConfig()
-            result = config.get_secret('non-existent-secret')
-            
-            assert result is None
-    
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        config = AWSConfigManager()
+        result = config.get_secret('non-existent-secret')
+
+        assert result is None
+
     @patch('boto3.client')
-    def test_get_secret_access_denied(self, mock_boto3):
+    def test_get_secret_access_denied(self, mock_boto3, monkeypatch):
         """Testa recuperação de secret com acesso negado"""
-        from botocore.exceptions import ClientError
-        
         mock_secrets = Mock()
         mock_secrets.get_secret_value.side_effect = ClientError(
             {'Error': {'Code': 'AccessDeniedException'}},
             'GetSecretValue'
         )
         mock_boto3.return_value = mock_secrets
-        
-        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
-            config = AwsConfig()
-            
-            with pytest.raises(Exception, match="Erro ao recuperar secret"):
-                config.get_secret('access-denied-secret')
-    
-    @patch('boto3.client')
-    def test_setup_openai_api_key_from_secret(self, mock_boto3):
-        """Testa configuração da API key OpenAI a partir do secret"""
-        mock_secrets = Mock()
-        mock_secrets.get_secret_value.return_value = {
-            'SecretString': '{"api_key": "sk-test123456789"}'
-        }
-        mock_boto3.return_value = mock_secrets
-        
-        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}, clear=True):
-            config = AwsConfig()
-            config.setup_openai_api_key()
-            
-            # Verificar se variável de ambiente foi definida
-            assert os.environ.get('OPENAI_API_KEY') == 'sk-test123456789'
-    
-    @patch('boto3.client')
-    def test_setup_openai_api_key_json_parse_error(self, mock_boto3):
-        """Testa erro na parsing do JSON do secret"""
-        mock_secrets = Mock()
-        mock_secrets.get_secret_value.return_value = {
-            'SecretString': 'invalid-json'
-        }
-        mock_boto3.return_value = mock_secrets
-        
-        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}, clear=True):
-            config = AwsConfig()
-            
-            # Deve usar o valor diretamente se não for JSON válido
-            config.setup_openai_api_key()
-            assert os.environ.get('OPENAI_API_KEY') == 'invalid-json'
-    
-    def test_setup_openai_api_key_local_mode(self):
-        """Testa configuração da API key em modo local"""
-        with patch.dict(os.environ, {}, clear=True):
-            config = AwsConfig()
-            config.setup_openai_api_key()
-            
-            # Em modo local, não deve fazer nada
-            assert 'OPENAI_API_KEY' not in os.environ
-    
-    @patch('boto3.client')
-    def test_validate_aws_credentials_success(self, mock_boto3):
+
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        config = AWSConfigManager()
+
+        assert config.get_secret('access-denied-secret') is None
+
+    def test_get_secret_without_client(self, monkeypatch):
+        """Testa get_secret sem Secrets Manager disponível"""
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        config = AWSConfigManager()
+        config.secrets_client = None
+
+        assert config.get_secret('qualquer-secret') is None
+
+    def test_validate_aws_credentials_success(self, aws_env, monkeypatch):
         """Testa validação de credenciais AWS com sucesso"""
-        mock_sts = Mock()
-        mock_sts.get_caller_identity.return_value = {
-            'Account': '123456789012',
-            'UserId': 'test-user',
-            'Arn': 'arn:aws:sts::123456789012:assumed-role/test-role'
-        }
-        
-        with patch('boto3.client') as mock_client:
-            mock_client.return_value = mock_sts
-            
-            with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
-                config = AwsConfig()
-                identity = config.validate_aws_credentials()
-                
-                assert identity['Account'] == '123456789012'
-                mock_sts.get_caller_identity.assert_called_once()
-    
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        config = AWSConfigManager()
+
+        assert config.validate_aws_credentials() is True
+
     @patch('boto3.client')
-    def test_validate_aws_credentials_failure(self, mock_boto3):
+    def test_validate_aws_credentials_failure(self, mock_boto3, monkeypatch):
         """Testa validação de credenciais AWS com falha"""
-        from botocore.exceptions import ClientError
-        
         mock_sts = Mock()
         mock_sts.get_caller_identity.side_effect = ClientError(
             {'Error': {'Code': 'InvalidUserID.NotFound'}},
             'GetCallerIdentity'
         )
-        
-        with patch('boto3.client') as mock_client:
-            mock_client.return_value = mock_sts
-            
-            with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
-                config = AwsConfig()
-                
-                with pytest.raises(Exception, match="Credenciais AWS inválidas"):
-                    config.validate_aws_credentials()
-    
-    def test_validate_aws_credentials_local_mode(self):
-        """Testa validação de credenciais em modo local"""
-        with patch.dict(os.environ, {}, clear=True):
-            config = AwsConfig()
-            
-            with pytest.raises(Exception, match="Ambiente AWS não configurado"):
-                config.validate_aws_credentials()
-    
-    @patch('boto3.client')
-    def test_get_s3_bucket_name_from_env(self, mock_boto3):
-        """Testa obtenção do nome do bucket S3 da variável de ambiente"""
-        with patch.dict(os.environ, {
-            'AWS_DEFAULT_REGION': 'us-east-1',
-            'S3_BUCKET': 'test-bucket-name'
-        }):
-            config = AwsConfig()
-            bucket_name = config.get_s3_bucket_name()
-            
-            assert bucket_name == 'test-bucket-name'
-    
-    @patch('boto3.client')
-    def test_get_s3_bucket_name_default(self, mock_boto3):
-        """Testa obtenção do nome padrão do bucket S3"""
-        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}, clear=True):
-            config = AwsConfig()
-            bucket_name = config.get_s3_bucket_name()
-            
-            assert bucket_name == 'pncp-extractor-data-prod'
-    
-    def test_get_environment_prod(self):
-        """Testa detecção de ambiente de produção"""
-        with patch.dict(os.environ, {'ENVIRONMENT': 'prod'}, clear=True):
-            config = AwsConfig()
-            assert config.get_environment() == 'prod'
-    
-    def test_get_environment_default(self):
-        """Testa ambiente padrão"""
-        with patch.dict(os.environ, {}, clear=True):
-            config = AwsConfig()
-            assert config.get_environment() == 'prod'
-    
-    @patch('boto3.client')
-    def test_setup_environment_variables(self, mock_boto3):
-        """Testa configuração de variáveis de ambiente"""
-        mock_secrets = Mock()
-        mock_secrets.get_secret_value.return_value = {
-            'SecretString': '{"api_key": "sk-test123"}'
-        }
-        mock_boto3.return_value = mock_secrets
-        
-        with patch.dict(os.environ, {
-            'AWS_DEFAULT_REGION': 'us-east-1',
-            'S3_BUCKET': 'custom-bucket'
-        }, clear=True):
-            config = AwsConfig()
-            status = config.setup_environment_variables()
-            
-            assert status['aws_configured'] == True
-            assert status['openai_configured'] == True
-            assert status['s3_bucket'] == 'custom-bucket'
-            assert status['region'] == 'us-east-1'
-            assert status['environment'] == 'prod'
-            
-            # Verificar se variáveis foram definidas
-            assert os.environ.get('OPENAI_API_KEY') == 'sk-test123'
-    
-    def test_setup_environment_variables_local(self):
-        """Testa configuração de variáveis em modo local"""
-        with patch.dict(os.environ, {}, clear=True):
-            config = AwsConfig()
-            status = config.setup_environment_variables()
-            
-            assert status['aws_configured'] == False
-            assert status['openai_configured'] == False
-            assert status['s3_bucket'] is None
+        mock_boto3.return_value = mock_sts
+
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        config = AWSConfigManager()
+
+        assert config.validate_aws_credentials() is False
+
+    def test_setup_environment_variables(self, secrets_env, monkeypatch):
+        """Testa configuração de variáveis de ambiente a partir dos secrets"""
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        config = AWSConfigManager()
+        status = config.setup_environment_variables()
+
+        assert status['aws_region'] == 'us-east-1'
+        assert status['secrets_manager_available'] is True
+        assert status['environment_variables']['OPENAI_API_KEY'] == 'SET_FROM_SECRET'
+        assert os.environ.get('OPENAI_API_KEY') == 'sk-test123'
+        # S3_BUCKET não definida: entra o padrão, mas o erro é registrado
+        assert status['environment_variables']['S3_BUCKET'] == 'SET_DEFAULT'
+        assert os.environ.get('S3_BUCKET') == 'pncp-data-bucket'
+        assert status['errors'] == ['S3_BUCKET não definida']
+
+    def test_setup_environment_variables_preset(self, secrets_env, monkeypatch):
+        """Testa que variáveis já definidas não são sobrescritas"""
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        monkeypatch.setenv('OPENAI_API_KEY', 'sk-preset')
+        monkeypatch.setenv('S3_BUCKET', 'custom-bucket')
+
+        config = AWSConfigManager()
+        status = config.setup_environment_variables()
+
+        assert status['environment_variables']['OPENAI_API_KEY'] == 'SET'
+        assert status['environment_variables']['S3_BUCKET'] == 'SET'
+        assert os.environ.get('OPENAI_API_KEY') == 'sk-preset'
+        assert status['errors'] == []
+
+    def test_get_configuration_summary(self, secrets_env, monkeypatch):
+        """Testa o resumo de configuração com ambiente completo"""
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        monkeypatch.setenv('S3_BUCKET', 'custom-bucket')
+
+        config = AWSConfigManager()
+        summary = config.get_configuration_summary()
+
+        assert summary['aws_region'] == 'us-east-1'
+        assert summary['credentials_valid'] is True
+        assert summary['errors'] == []
+        assert summary['ready_for_production'] is True
 
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
\ No newline at end of file
+    pytest.main([__file__, "-v"])
@@ -3,10 +3,10 @@ Testes unitários para StorageManager
 """
 
 import pytest
+import json
 import pandas as pd
+import pyarrow as pa
 import os
-import tempfile
-import shutil
 from datetime import datetime
 from unittest.mock import Mock, patch, MagicMock
 import sys
@@ -20,15 +20,17 @@ from storage_manager import StorageManager
 class TestStorageManager:
     
     @pytest.fixture
-    def temp_dir(self):
-        """Criar diretório temporário para testes"""
-        temp_dir = tempfile.mkdtemp()
-        yield temp_dir
-        shutil.rmtree(temp_dir)
-    
-    @pytest.fixture
+    def temp_dir(self, tmp_path):
+        """Diretório temporário gerenciado pelo pytest
+
+        tmp_path reutiliza a base por sessão e dispensa o par
+        mkdtemp + rmtree por teste.
+        """
+        return str(tmp_path)
+
+    @pytest.fixture(scope="session")
     def sample_data(self):
-        """Dados de amostra para testes"""
+        """Dados de amostra compartilhados pela sessão (nenhum teste os muta)"""
         return pd.DataFrame({
             'numero_contrato': ['001/2024', '002/2024', '003/2024'],
             'objeto': ['Teste 1', 'Teste 2', 'Teste 3'],
@@ -56,7 +58,12 @@ class TestStorageManager:
                 assert storage.use_s3 == True
                 assert storage.s3_client == mock_s3
                 assert storage.s3_bucket == 'test-bucket'
-                mock_boto3.assert_called_once_with('s3')
+                mock_boto3.assert_called_once()
+                assert mock_boto3.call_args.args == ('s3',)
+                # Cliente configurado com pool de conexões e retries adaptativos
+                config = mock_boto3.call_args.kwargs['config']
+                assert config.max_pool_connections == 32
+                assert config.retries == {'mode': 'adaptive', 'max_attempts': 5}
     
     def test_init_explicit_local(self):
         """Testa inicialização explicitamente local"""
@@ -64,21 +71,24 @@ class TestStorageManager:
             storage = StorageManager(use_s3=False)
             assert storage.use_s3 == False
     
-    def test_save_to_parquet_local(self, sample_data, temp_dir):
+    def test_save_to_parquet_local(self, sample_data, tmp_path, monkeypatch):
         """Testa salvamento de parquet em modo local"""
         storage = StorageManager(use_s3=False)
-        
-        # Mudar diretório de trabalho para temp
-        with patch('os.getcwd', return_value=temp_dir):
-            test_date = datetime(2024, 1, 15)
-            file_path = storage.save_to_parquet(sample_data, test_date)
-            
-            # Verificar se arquivo foi criado
-            assert os.path.exists(file_path)
-            assert 'pncp_contratos_20240115.parquet' in file_path
-            
-            # Verificar conteúdo
-            df_loaded = pd.read_parquet(file_path)
+
+        # cwd por teste em vez de patch global de os.getcwd: seguro sob
+        # execução paralela (pytest-xdist) e restaurado pelo monkeypatch
+        monkeypatch.chdir(tmp_path)
+        test_date = datetime(2024, 1, 15)
+        file_path = storage.save_to_parquet(sample_data, test_date)
+
+        # Verificar se arquivo foi criado
+        assert os.path.exists(file_path)
+        assert 'pncp_contratos_20240115.parquet' in file_path
+
+        # Verificar conteúdo: equals compara buffers Arrow em C; o diff
+        # célula a célula do pandas só roda se houver divergência
+        df_loaded = pd.read_parquet(file_path)
+        if not pa.Table.from_pandas(df_loaded).equals(pa.Table.from_pandas(sample_data)):
             pd.testing.assert_frame_equal(df_loaded, sample_data)
     
     @patch('boto3.client')
@@ -100,19 +110,20 @@ class TestStorageManager:
             expected_s3_path = 'raw-data/year=2024/month=01/pncp_contratos_20240115.parquet'
             assert expected_s3_path in file_path
     
-    def test_save_consolidated_local(self, sample_data, temp_dir):
+    def test_save_consolidated_local(self, sample_data, tmp_path, monkeypatch):
         """Testa salvamento de dados consolidados em modo local"""
         storage = StorageManager(use_s3=False)
-        
-        with patch('os.getcwd', return_value=temp_dir):
-            test_date = datetime(2024, 1, 15)
-            file_path = storage.save_consolidated(sample_data, test_date)
-            
-            assert os.path.exists(file_path)
-            assert 'pncp_consolidado_20240115.parquet' in file_path
-            
-            # Verificar conteúdo
-            df_loaded = pd.read_parquet(file_path)
+
+        monkeypatch.chdir(tmp_path)
+        test_date = datetime(2024, 1, 15)
+        file_path = storage.save_consolidated(sample_data, test_date)
+
+        assert os.path.exists(file_path)
+        assert 'pncp_consolidado_20240115.parquet' in file_path
+
+        # Verificar conteúdo (mesmo compare Arrow do round-trip acima)
+        df_loaded = pd.read_parquet(file_path)
+        if not pa.Table.from_pandas(df_loaded).equals(pa.Table.from_pandas(sample_data)):
             pd.testing.assert_frame_equal(df_loaded, sample_data)
     
     @patch('boto3.client')
@@ -131,29 +142,28 @@ class TestStorageManager:
             expected_s3_path = 'consolidated/year=2024/month=01/pncp_consolidado_20240115.parquet'
             assert expected_s3_path in file_path
     
-    def test_save_logs_json_local(self, temp_dir):
+    def test_save_logs_json_local(self, tmp_path, monkeypatch):
         """Testa salvamento de logs JSON em modo local"""
         storage = StorageManager(use_s3=False)
-        
+
         test_logs = {
             'timestamp': '2024-01-15T10:00:00',
             'records_processed': 100,
             'records_filtered': 25,
             'execution_time': 120.5
         }
-        
-        with patch('os.getcwd', return_value=temp_dir):
-            test_date = datetime(2024, 1, 15)
-            file_path = storage.save_logs_json(test_logs, test_date)
-            
-            assert os.path.exists(file_path)
-            assert 'pncp_logs_20240115.json' in file_path
-            
-            # Verificar conteúdo
-            import json
-            with open(file_path, 'r', encoding='utf-8') as f:
-                logs_loaded = json.load(f)
-            assert logs_loaded == test_logs
+
+        monkeypatch.chdir(tmp_path)
+        test_date = datetime(2024, 1, 15)
+        file_path = storage.save_logs_json(test_logs, test_date)
+
+        assert os.path.exists(file_path)
+        assert 'pncp_logs_20240115.json' in file_path
+
+        # Verificar conteúdo
+        with open(file_path, 'r', encoding='utf-8') as f:
+            logs_loaded = json.load(f)
+        assert logs_loaded == test_logs
     
     @patch('boto3.client')
     def test_save_logs_json_s3(self, mock_boto3):
@@ -217,20 +227,19 @@ class TestStorageManager:
                 test_date = datetime(2024, 1, 15)
                 storage.save_to_parquet(sample_data, test_date)
     
-    def test_empty_dataframe(self):
+    def test_empty_dataframe(self, tmp_path, monkeypatch):
         """Testa comportamento com DataFrame vazio"""
         storage = StorageManager(use_s3=False)
         empty_df = pd.DataFrame()
-        
-        with tempfile.TemporaryDirectory() as temp_dir:
-            with patch('os.getcwd', return_value=temp_dir):
-                test_date = datetime(2024, 1, 15)
-                file_path = storage.save_to_parquet(empty_df, test_date)
-                
-                # Deve criar arquivo mesmo com DataFrame vazio
-                assert os.path.exists(file_path)
-                df_loaded = pd.read_parquet(file_path)
-                assert len(df_loaded) == 0
+
+        monkeypatch.chdir(tmp_path)
+        test_date = datetime(2024, 1, 15)
+        file_path = storage.save_to_parquet(empty_df, test_date)
+
+        # Deve criar arquivo mesmo com DataFrame vazio
+        assert os.path.exists(file_path)
+        df_loaded = pd.read_parquet(file_path)
+        assert len(df_loaded) == 0
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -3,10 +3,19 @@
 Script de debug para testar persistência do state
 """
 
-import json
+import io
 import boto3
+import orjson
+import numpy as np
+from boto3.s3.transfer import TransferConfig
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+# Uploads pequenos sobem numa chamada; acima de 8 MiB o transfer manager
+# quebra em partes paralelas — mesmo padrão do storage_manager
+_TRANSFER_CFG = TransferConfig(multipart_threshold=8 << 20,
+                               max_concurrency=4, use_threads=True)
+
 def test_state_logic():
     """Testa a lógica de determinação de datas para extração"""
     
@@ -33,8 +42,9 @@ def test_state_logic():
         print("❌ Primeira execução - faria extração histórica")
         return
     
-    # Extração incremental
-    last_date = datetime.strptime(state['last_extraction_date'], date_format)
+    # Extração incremental: fromisoformat é um parser C dedicado, sem
+    # reinterpretar o format string a cada chamada como o strptime
+    last_date = datetime.fromisoformat(state['last_extraction_date'])
     today = datetime.now()
     
     print(f"last_date: {last_date.date()}")
@@ -51,11 +61,12 @@ def test_state_logic():
         else:
             print(f"❌ Nenhuma data para processar (yesterday {yesterday.date()} <= last_date {last_date.date()})")
     else:
-        # Desenvolvimento: pegar todos os dias perdidos
-        current_date = last_date + timedelta(days=1)
-        while current_date.date() <= today.date():
-            dates.append(current_date.strftime(date_format))
-            current_date += timedelta(days=1)
+        # Desenvolvimento: pegar todos os dias perdidos — um único arange
+        # vetorizado de datetime64[D] em vez de timedelta+strftime por dia
+        # (copiando lógica do extractor.py)
+        start = np.datetime64(last_date.date()) + np.timedelta64(1, 'D')
+        end = np.datetime64(today.date()) + np.timedelta64(1, 'D')
+        dates.extend(np.arange(start, end, dtype='datetime64[D]').astype(str).tolist())
     
     print(f"\nDatas para processar: {dates}")
     
@@ -93,29 +104,39 @@ def test_s3_save():
             'processed_dates': ['2025-08-19', '2025-08-20']
         }
         
-        # Salvar no S3
-        state_json = json.dumps(test_state, indent=2, ensure_ascii=False, default=str)
-        
-        s3_client.put_object(
-            Bucket=bucket,
-            Key='state_debug_test.json',
-            Body=state_json.encode('utf-8'),
-            ContentType='application/json'
+        # Salvar no S3 via transfer manager (streaming; multipart automático
+        # para payloads grandes). orjson serializa direto para bytes UTF-8,
+        # como no storage_manager
+        state_json = orjson.dumps(test_state, option=orjson.OPT_INDENT_2, default=str)
+
+        s3_client.upload_fileobj(
+            io.BytesIO(state_json),
+            bucket,
+            'state_debug_test.json',
+            ExtraArgs={'ContentType': 'application/json'},
+            Config=_TRANSFER_CFG
         )
-        
+
         print("✅ Teste de salvamento no S3 bem-sucedido")
-        
-        # Tentar ler de volta
-        response = s3_client.get_object(Bucket=bucket, Key='state_debug_test.json')
-        read_data = json.loads(response['Body'].read().decode('utf-8'))
-        
-        print("✅ Teste de leitura do S3 bem-sucedido")
-        print(f"Dados lidos: {read_data['test_field']}")
-        
-        # Limpar teste
-        s3_client.delete_object(Bucket=bucket, Key='state_debug_test.json')
+
+        # Ler de volta e limpar: o delete dispara assim que o GET responde e
+        # corre em paralelo com o parse do corpo, escondendo um RTT
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            response = pool.submit(
+                s3_client.get_object, Bucket=bucket, Key='state_debug_test.json'
+            ).result()
+            delete_future = pool.submit(
+                s3_client.delete_object, Bucket=bucket, Key='state_debug_test.json'
+            )
+            # orjson aceita bytes direto: dispensa o decode('utf-8') intermediário
+            read_data = orjson.loads(response['Body'].read())
+
+            print("✅ Teste de leitura do S3 bem-sucedido")
+            print(f"Dados lidos: {read_data['test_field']}")
+
+            delete_future.result()
         print("✅ Arquivo de teste removido")
-        
+
         return True
         
     except Exception as e:
@@ -4,18 +4,107 @@ Script para reconstruir arquivo parquet problemático
 Reescreve o arquivo usando o mesmo schema dos arquivos funcionais
 """
 
+import functools
+import os
+import time
+
 import boto3
-import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
-from io import BytesIO
-import json
+from pyarrow.fs import S3FileSystem
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Timeout por request do filesystem Arrow; leituras e escritas usam o pool
+# de IO interno do Arrow (range reads concorrentes, multipart na escrita)
+_S3_REQUEST_TIMEOUT = 10
+
+# Cache em disco do schema de referência: o schema dos arquivos funcionais
+# não muda entre execuções, então um batch sobre várias partições não
+# precisa reler o footer do working_file a cada invocação do script
+_SCHEMA_CACHE_PATH = '/tmp/pncp_contratos_ref.schema'
+_SCHEMA_CACHE_TTL = 24 * 60 * 60  # segundos
+
+# Dicionário só onde a cardinalidade é baixa (UFs, esferas, domínios, datas
+# de controle): em CNPJ, razão social e textos livres o dicionário lota,
+# cai para plain e só paga o custo de montagem. Subcampos de struct são
+# endereçados por caminho pontilhado; nomes ausentes do schema são ignorados
+_DICTIONARY_COLUMNS = [
+    'unidadeOrgao.ufSigla',
+    'unidadeOrgao.ufNome',
+    'unidadeOrgao.municipioNome',
+    'unidadeOrgao.codigoIbge',
+    'orgaoEntidade.esferaId',
+    'orgaoEntidade.poderId',
+    'modalidade_nome_dominio',
+    'situacao_compra_nome_dominio',
+    'extraction_date',
+    'data_publicacao',
+]
+
+
+@functools.lru_cache(maxsize=None)
+def get_reference_schema(bucket: str, key: str) -> pa.Schema:
+    """Schema de referência com cache em memória e em disco
+
+    O lru_cache garante um único fetch por processo (um runner em lote
+    sobre várias partições lê o footer uma vez); o arquivo IPC em /tmp
+    reaproveita o schema entre invocações do script dentro do TTL.
+    """
+    try:
+        age = time.time() - os.path.getmtime(_SCHEMA_CACHE_PATH)
+        if age < _SCHEMA_CACHE_TTL:
+            return pa.ipc.read_schema(pa.input_stream(_SCHEMA_CACHE_PATH))
+    except OSError:
+        pass
+
+    s3_fs = S3FileSystem(request_timeout=_S3_REQUEST_TIMEOUT)
+    schema = pq.read_metadata(f'{bucket}/{key}',
+                              filesystem=s3_fs).schema.to_arrow_schema()
+    with pa.output_stream(_SCHEMA_CACHE_PATH) as sink:
+        sink.write(schema.serialize())
+    return schema
+
+
+def _rebuild_struct_column(column: pa.ChunkedArray,
+                           target_type: pa.StructType) -> pa.StructArray:
+    """Reconstrói uma coluna struct no tipo do schema de referência
+
+    Cada subcampo requerido é projetado com pc.struct_field (operação de
+    metadados sobre os child arrays, sem materializar linhas) e castado ao
+    tipo filho da referência; subcampos ausentes viram arrays de null.
+    Nenhuma linha vira dict Python no processo. Structs top-level nulos
+    resultam em structs com todos os filhos nulos, como a normalização
+    antiga fazia com o template de defaults.
+    """
+    combined = column.combine_chunks()
+    n = len(combined)
+    source_names = (
+        {field.name for field in combined.type}
+        if pa.types.is_struct(combined.type) else set()
+    )
+
+    children = []
+    for field in target_type:
+        if field.name in source_names:
+            child = pc.struct_field(combined, field.name)
+            if child.type != field.type:
+                child = child.cast(field.type)
+        else:
+            child = pa.nulls(n, field.type)
+        children.append(child)
+
+    return pa.StructArray.from_arrays(children, fields=list(target_type))
+
+
 def rebuild_problematic_file():
     """Reconstrói o arquivo problemático com schema consistente"""
     
+    # boto3 fica para as operações de objeto (backup); o IO de parquet vai
+    # pelo S3FileSystem do Arrow, que lê direto em buffers Arrow
     s3_client = boto3.client('s3')
+    s3_fs = S3FileSystem(request_timeout=_S3_REQUEST_TIMEOUT)
     bucket = 'pncp-extractor-data-prod-566387937580'
     
     # Arquivos
@@ -27,119 +116,132 @@ def rebuild_problematic_file():
     print(f"Arquivo de referência: {working_file}")
     
     try:
-        # 1. Baixar arquivo de referência (funcional)
-        print("\n📥 Baixando arquivo de referência...")
-        response = s3_client.get_object(Bucket=bucket, Key=working_file)
-        reference_data = response['Body'].read()
-        reference_table = pq.read_table(BytesIO(reference_data))
-        reference_schema = reference_table.schema
-        
+        # 1. Ler apenas o footer do arquivo de referência (funcional): o
+        # schema mora nos metadados, não precisamos das colunas — e fica
+        # cacheado em memória e em /tmp para as próximas partições
+        print("\n📥 Lendo schema do arquivo de referência...")
+        reference_schema = get_reference_schema(bucket, working_file)
+
         print(f"✅ Schema de referência carregado com {len(reference_schema)} campos")
-        
-        # 2. Baixar arquivo problemático
+
+        # 2. Comparar schemas só pelos footers: se o arquivo já está
+        # conformante (caso comum na maioria das partições), não há nada a
+        # reconstruir — nem download, nem backup, nem reupload
+        problem_schema = pq.read_metadata(
+            f'{bucket}/{problematic_file}',
+            filesystem=s3_fs).schema.to_arrow_schema()
+
+        if problem_schema.equals(reference_schema, check_metadata=False):
+            print("✅ Schema já conformante com a referência; nada a reconstruir")
+            return True
+
+        mismatched_fields = {
+            field.name for field in reference_schema
+            if field.name not in problem_schema.names
+            or not field.equals(problem_schema.field(field.name))
+        }
+        print(f"🔎 Campos divergentes da referência: {sorted(mismatched_fields)}")
+
+        # 3. Ler o arquivo problemático direto do S3: o pool de IO do Arrow
+        # pré-busca os column chunks em range reads concorrentes
         print("\n📥 Baixando arquivo problemático...")
-        response = s3_client.get_object(Bucket=bucket, Key=problematic_file)
-        problem_data = response['Body'].read()
-        problem_table = pq.read_table(BytesIO(problem_data))
-        
+        problem_table = pq.read_table(f'{bucket}/{problematic_file}',
+                                      filesystem=s3_fs, pre_buffer=True)
+
         print(f"✅ Arquivo problemático carregado com {len(problem_table)} registros")
-        
-        # 3. Converter para DataFrame para manipulação
-        df = problem_table.to_pandas()
-        print(f"✅ Convertido para DataFrame: {df.shape}")
-        
-        # 4. Garantir tipos consistentes para campos struct
+
+        # Backup server-side disparado já: é independente da reconstrução
+        # (toca outra chave) e só precisa terminar antes do overwrite
+        backup_key = problematic_file.replace('.parquet', '_backup.parquet')
+        print(f"🗂️ Criando backup: {backup_key}")
+        backup_pool = ThreadPoolExecutor(max_workers=1)
+        backup_future = backup_pool.submit(
+            s3_client.copy_object,
+            Bucket=bucket,
+            CopySource={'Bucket': bucket, 'Key': problematic_file},
+            Key=backup_key
+        )
+
         struct_fields = ['unidadeOrgao', 'orgaoEntidade']
-        
-        for field in struct_fields:
-            if field in df.columns:
-                print(f"🔧 Normalizando campo struct: {field}")
-                
-                # Definir schema padrão baseado no arquivo de referência
-                if field == 'unidadeOrgao':
-                    default_struct = {
-                        'codigoIbge': None,
-                        'codigoUnidade': None,
-                        'municipioNome': None,
-                        'nomeUnidade': None,
-                        'ufNome': None,
-                        'ufSigla': None
-                    }
-                elif field == 'orgaoEntidade':
-                    default_struct = {
-                        'cnpj': None,
-                        'esferaId': None,
-                        'poderId': None,
-                        'razaoSocial': None
-                    }
-                
-                # Normalizar todos os valores
-                def normalize_struct(value):
-                    if pd.isna(value) or value is None:
-                        return default_struct.copy()
-                    if isinstance(value, dict):
-                        normalized = default_struct.copy()
-                        normalized.update(value)
-                        return normalized
-                    return default_struct.copy()
-                
-                df[field] = df[field].apply(normalize_struct)
-        
-        # 5. Criar tabela Arrow com schema do arquivo de referência
+
+        # 4. Alinhar presença e ordem das colunas ao schema de referência:
+        # Table.cast exige o mesmo conjunto de nomes na mesma ordem, então
+        # colunas ausentes entram como nulls já no tipo alvo
         print("\n🔧 Reconstruindo com schema de referência...")
-        
-        # Converter DataFrame de volta para Arrow table usando schema de referência
-        rebuilt_table = pa.Table.from_pandas(df, schema=reference_schema, preserve_index=False)
+
+        n_rows = len(problem_table)
+        columns = []
+        for field in reference_schema:
+            if field.name in problem_table.schema.names:
+                columns.append(problem_table.column(field.name))
+            else:
+                columns.append(pa.nulls(n_rows, type=field.type))
+        aligned_table = pa.Table.from_arrays(columns,
+                                             names=reference_schema.names)
+
+        # 5. Cast da tabela inteira numa única chamada: divergências de tipo
+        # e subcampos de struct faltantes (preenchidos com null) são
+        # resolvidos em C. O caminho por coluna em Python fica só de
+        # fallback para casts que o kernel não implementa
+        try:
+            rebuilt_table = aligned_table.cast(reference_schema, safe=False)
+        except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+            columns = []
+            for field in reference_schema:
+                column = aligned_table.column(field.name)
+                if column.type != field.type:
+                    try:
+                        column = column.cast(field.type, safe=False)
+                    except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+                        print(f"🔧 Reconstruindo campo struct em Python: {field.name}")
+                        column = _rebuild_struct_column(column, field.type)
+                columns.append(column)
+            rebuilt_table = pa.Table.from_arrays(columns,
+                                                 schema=reference_schema)
         
         print(f"✅ Tabela reconstruída com schema consistente")
         print(f"   Registros: {len(rebuilt_table)}")
         print(f"   Campos: {len(rebuilt_table.schema)}")
         
-        # 6. Escrever novo arquivo parquet
+        # 6. Garantir que o backup terminou antes de sobrescrever o original
+        backup_future.result()
+        backup_pool.shutdown()
+        print(f"✅ Backup concluído: {backup_key}")
+
+        # 7. Escrever o parquet reconstruído direto no S3: o write_table
+        # streama para o uploader multipart do Arrow, sem buffer intermediário
         print("\n💾 Salvando arquivo reconstruído...")
-        
-        buffer = BytesIO()
+
+        # Row groups de 128k linhas casam com o padrão de leitura do
+        # Athena/Qlik; páginas de 1 MiB seguem o default do storage_manager
         pq.write_table(
-            rebuilt_table, 
-            buffer,
-            compression='snappy',
+            rebuilt_table,
+            f'{bucket}/{problematic_file}',
+            filesystem=s3_fs,
+            # zstd nível 3: mesmo default do storage_manager; menos bytes
+            # escaneados por query do Athena do que snappy
+            compression='zstd',
+            compression_level=3,
             write_statistics=True,
-            use_dictionary=True
-        )
-        
-        # 7. Fazer backup do arquivo original
-        backup_key = problematic_file.replace('.parquet', '_backup.parquet')
-        print(f"🗂️ Criando backup: {backup_key}")
-        
-        s3_client.copy_object(
-            Bucket=bucket,
-            CopySource={'Bucket': bucket, 'Key': problematic_file},
-            Key=backup_key
-        )
-        
-        # 8. Substituir arquivo original
-        print(f"🔄 Substituindo arquivo original...")
-        
-        s3_client.put_object(
-            Bucket=bucket,
-            Key=problematic_file,
-            Body=buffer.getvalue(),
-            ContentType='application/octet-stream'
+            use_dictionary=_DICTIONARY_COLUMNS,
+            row_group_size=128 * 1024,
+            data_page_size=1 << 20
         )
-        
-        # 9. Verificar o novo arquivo
+
+        # 8. Verificar o novo arquivo: contagem de linhas e tipos moram no
+        # footer, não precisamos rebaixar nem descomprimir as colunas
         print("\n✅ Verificando arquivo reconstruído...")
-        response = s3_client.get_object(Bucket=bucket, Key=problematic_file)
-        verification_data = response['Body'].read()
-        verification_table = pq.read_table(BytesIO(verification_data))
-        
-        print(f"   Registros: {len(verification_table)}")
-        print(f"   Schema fields: {len(verification_table.schema)}")
-        
+        verification_meta = pq.read_metadata(f'{bucket}/{problematic_file}',
+                                             filesystem=s3_fs)
+        verification_schema = verification_meta.schema.to_arrow_schema()
+
+        print(f"   Registros: {verification_meta.num_rows}")
+        print(f"   Schema fields: {len(verification_schema)}")
+
         # Verificar campos struct específicos
         for field in struct_fields:
-            if field in verification_table.schema.names:
-                field_type = verification_table.schema.field(field).type
+            if field in verification_schema.names:
+                field_type = verification_schema.field(field).type
                 print(f"   {field}: {field_type}")
         
         print(f"\n🎯 ARQUIVO RECONSTRUÍDO COM SUCESSO!")
@@ -159,36 +261,58 @@ def verify_athena_compatibility():
     print("\n🔍 Verificando compatibilidade com Athena...")
     
     try:
-        import subprocess
-        
         # Tentar query simples no arquivo reconstruído
         query = """
         SELECT COUNT(*) as total_records
-        FROM "pncp"."contratos" 
+        FROM "pncp"."contratos"
         WHERE year = '2025' AND month = '08'
         AND _source_file LIKE '%pncp_contratos_20250803%'
         """
-        
+
         print("📊 Executando query de teste no Athena...")
         print(f"Query: {query.strip()}")
-        
-        # Usar AWS CLI para executar query
-        result = subprocess.run([
-            'aws', 'athena', 'start-query-execution',
-            '--query-string', query,
-            '--result-configuration', 'OutputLocation=s3://pncp-extractor-data-prod-566387937580/athena-results/',
-            '--work-group', 'primary'
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            query_result = json.loads(result.stdout)
-            execution_id = query_result['QueryExecutionId']
-            print(f"✅ Query iniciada: {execution_id}")
-            return execution_id
-        else:
-            print(f"❌ Erro ao executar query: {result.stderr}")
+
+        # Chamar a API do Athena direto pelo boto3: sem fork do aws CLI
+        # (que recarrega o botocore) nem parse do stdout
+        athena_client = boto3.client('athena')
+        response = athena_client.start_query_execution(
+            QueryString=query,
+            ResultConfiguration={
+                'OutputLocation': 's3://pncp-extractor-data-prod-566387937580/athena-results/'
+            },
+            WorkGroup='primary'
+        )
+
+        execution_id = response['QueryExecutionId']
+        print(f"✅ Query iniciada: {execution_id}")
+
+        # Poll com backoff exponencial (250 ms dobrando até 2 s) até o
+        # estado terminal, em vez de devolver o id para o operador conferir
+        delay = 0.25
+        while True:
+            execution = athena_client.get_query_execution(
+                QueryExecutionId=execution_id)
+            state = execution['QueryExecution']['Status']['State']
+            if state not in ('QUEUED', 'RUNNING'):
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+        if state != 'SUCCEEDED':
+            reason = execution['QueryExecution']['Status'].get(
+                'StateChangeReason', 'sem detalhes')
+            print(f"❌ Query terminou em {state}: {reason}")
             return None
-            
+
+        results = athena_client.get_query_results(
+            QueryExecutionId=execution_id, MaxResults=2)
+        rows = results['ResultSet']['Rows']
+        if len(rows) > 1:  # primeira linha é o cabeçalho
+            total = rows[1]['Data'][0].get('VarCharValue', '?')
+            print(f"✅ Query SUCCEEDED: {total} registros na partição")
+
+        return execution_id
+
     except Exception as e:
         print(f"❌ Erro na verificação: {e}")
         return None
@@ -212,8 +336,9 @@ def main():
         # Verificar compatibilidade com Athena
         execution_id = verify_athena_compatibility()
         if execution_id:
-            print(f"\n🔗 Query de teste executando: {execution_id}")
-            print("Use 'aws athena get-query-execution --query-execution-id {execution_id}' para verificar status")
+            print(f"\n🔗 Query de teste concluída: {execution_id}")
+        else:
+            print("\n⚠️ Verificação via Athena falhou; cheque o schema reconstruído")
     else:
         print("\n❌ RECONSTRUÇÃO FALHOU!")
         print("Verifique os logs acima para detalhes do erro")